@@ -5,6 +5,8 @@ Features:
 - Auto-discovers the latest NHS WLMDS Excel URL if WLMDS_URL is not set.
 - Auto-selects a worksheet containing "provider" in its name if WLMDS_SHEET is not set.
 - Accepts either an HTTP(S) URL or a local file path for WLMDS_URL.
+- Caches HTTP downloads on disk and revalidates them with conditional GETs
+  (ETag / Last-Modified), so unchanged releases are not re-downloaded.
 - Parses provider-level wait times and upserts them into `wait_metrics`.
 - Creates the table if it does not exist.
 
@@ -16,23 +18,33 @@ Environment variables:
     - WLMDS_URL (optional): HTTP(S) URL or local path to a WLMDS Excel file.
     - WLMDS_SHEET (optional): Exact sheet name to read. If not set, auto-pick a
       sheet whose name contains "provider" (case-insensitive), else the first sheet.
+    - WLMDS_CACHE_DIR (optional): Directory for the HTTP download cache. Defaults
+      to `wlmds_cache` under the system temp directory.
 """
 
 from __future__ import annotations
 
+import io
 import os
 import re
+import json
+import hashlib
 import logging
+import operator
 import tempfile
 import shutil
 from datetime import datetime
-from typing import Iterable, Tuple, List, Dict, Optional
+from typing import Iterable, Tuple, List, Dict, Optional, Union
 from urllib.parse import urljoin, urlparse
 
 import requests  # type: ignore
+import openpyxl  # type: ignore
 import pandas as pd  # type: ignore
+import pyarrow as pa  # type: ignore
+import pyarrow.compute as pc  # type: ignore
+import pyarrow.csv as pa_csv  # type: ignore
 import psycopg2  # type: ignore
-from psycopg2.extras import execute_values  # type: ignore
+from selectolax.lexbor import LexborHTMLParser  # type: ignore
 
 # ------------------------------------------------------------------------------
 # Config / Logging
@@ -44,48 +56,131 @@ NHS_WLMDS_PAGE = (
     "rtt-waiting-times/wlmds/"
 )
 
+CACHE_DIR = os.environ.get("WLMDS_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "wlmds_cache")
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# Patterns used on every run, compiled once at import
+_RELEASE_DATE_RE = re.compile(r"WLMDS-Summary-to-(\d{1,2})-([A-Za-z]{3,})-(\d{4})", re.IGNORECASE)
+_PROVIDER_RE = re.compile(r"provider", re.IGNORECASE)
+
+# Shared session so the page lookup and the xlsx download reuse one connection.
+SESSION = requests.Session()
+
 # ------------------------------------------------------------------------------
 # Discovery & Download helpers
 # ------------------------------------------------------------------------------
 
+def fetch_with_cache(url: str, session: Optional[requests.Session] = None, timeout: int = 60) -> Tuple[str, str]:
+    """
+    GET `url`, revalidating any copy cached by a previous run with
+    If-None-Match / If-Modified-Since. On HTTP 304 the cached body is reused.
+    Returns (path of the cached body, final URL after redirects).
+    """
+    s = session or SESSION
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    meta_path = os.path.join(CACHE_DIR, f"{key}.meta.json")
+    body_path = os.path.join(CACHE_DIR, f"{key}.body")
+
+    meta: Dict[str, Optional[str]] = {}
+    if os.path.exists(meta_path) and os.path.exists(body_path):
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    with s.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+        if resp.status_code == 304 and meta:
+            logging.info("Not modified since last run, using cached copy of %s", url)
+            return body_path, meta.get("url") or url
+        resp.raise_for_status()
+
+        # Stream to a side file in chunks rather than buffering the whole body
+        # in memory; the rename also means an interrupted run never leaves a
+        # truncated body behind a valid meta file.
+        part_path = f"{body_path}.part"
+        with open(part_path, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+    os.replace(part_path, body_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "url": resp.url,
+            },
+            f,
+        )
+    return body_path, resp.url
+
+
+def _release_date(href: str) -> datetime:
+    """
+    Parse the `to-<day>-<month>-<year>` token of a WLMDS-Summary filename.
+    Unparseable names sort first (datetime.min).
+    """
+    m = _RELEASE_DATE_RE.search(href)
+    if not m:
+        return datetime.min
+    day, month, year = m.groups()
+    try:
+        # Month names appear as "Mar", "March" or "Sept"; the first three
+        # letters are enough for %b.
+        return datetime.strptime(f"{day}-{month[:3]}-{year}", "%d-%b-%Y")
+    except ValueError:
+        return datetime.min
+
+
 def discover_latest_wlmds_url(session: Optional[requests.Session] = None) -> str:
     """
     Fetch the NHS WLMDS page and pick the newest WLMDS-Summary-to-*.xlsx link.
     """
-    s = session or requests.Session()
     logging.info("Discovering latest WLMDS URL from NHS page …")
-    resp = s.get(NHS_WLMDS_PAGE, timeout=30)
-    resp.raise_for_status()
-
-    # Find all links that look like WLMDS-Summary-to-<date>.xlsx
-    links = re.findall(
-        r'href="([^"]*WLMDS-Summary-to-[^"]*\.xlsx)"',
-        resp.text,
-        flags=re.IGNORECASE,
-    )
+    page_path, page_url = fetch_with_cache(NHS_WLMDS_PAGE, session=session, timeout=30)
+    with open(page_path, encoding="utf-8", errors="replace") as f:
+        html = f.read()
+
+    # Find all links that look like WLMDS-Summary-to-<date>.xlsx. Parsing the
+    # markup (rather than regex over it) handles any quoting style and returns
+    # entity-decoded href values.
+    links = []
+    for node in LexborHTMLParser(html).css("a[href]"):
+        href = (node.attributes.get("href") or "").strip()
+        lowered = href.lower()
+        if "wlmds-summary-to-" in lowered and lowered.endswith(".xlsx"):
+            links.append(href)
     if not links:
         raise RuntimeError("Could not find any WLMDS-Summary-to-*.xlsx links on the NHS page")
 
-    abs_links = [urljoin(resp.url, href) for href in links]
-    abs_links = sorted(set(abs_links))  # de-dup + sort
-    chosen = abs_links[-1]  # last is typically the newest by filename
+    abs_links = {urljoin(page_url, href) for href in links}  # de-dup
+    # Pick by the release date in the filename; lexical order is wrong for
+    # e.g. "to-30-Mar-2025" vs "to-9-Apr-2025". Ties fall back to the name.
+    chosen = max(abs_links, key=lambda link: (_release_date(link), link))
     logging.info("Discovered WLMDS: %s", chosen)
     return chosen
 
 
 def download_to_temp(src: str) -> str:
     """
-    If `src` is an HTTP(S) URL, download to a temp .xlsx.
+    If `src` is an HTTP(S) URL, download to a temp .xlsx (via the on-disk cache).
     If `src` is a local path, copy it to a temp .xlsx (so we can always clean up).
     Returns the temp file path.
     """
     parsed = urlparse(src)
     if parsed.scheme in ("http", "https"):
         logging.info("Downloading WLMDS from %s", src)
-        resp = requests.get(src, timeout=60)
-        resp.raise_for_status()
+        cached_path, _ = fetch_with_cache(src, timeout=60)
         with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            tmp.write(resp.content)
+            shutil.copyfile(cached_path, tmp.name)
             return tmp.name
     else:
         # Treat as local path
@@ -97,36 +192,65 @@ def download_to_temp(src: str) -> str:
             return tmp.name
 
 
-def choose_provider_sheet(xls: pd.ExcelFile, explicit: Optional[str] = None) -> str:
+def choose_provider_sheet(wb: openpyxl.Workbook, explicit: Optional[str] = None) -> str:
     """
     Return the sheet to use. Prefer explicit; otherwise first one containing 'provider'.
     Fallback to first sheet if none match.
     """
     if explicit:
-        if explicit in xls.sheet_names:
+        if explicit in wb.sheetnames:
             return explicit
-        raise ValueError(f"Worksheet '{explicit}' not found. Available: {xls.sheet_names}")
+        raise ValueError(f"Worksheet '{explicit}' not found. Available: {wb.sheetnames}")
 
-    for name in xls.sheet_names:
-        if re.search(r"provider", name, re.IGNORECASE):
+    for name in wb.sheetnames:
+        if _PROVIDER_RE.search(name):
             return name
 
     # Fallback
-    return xls.sheet_names[0]
+    return wb.sheetnames[0]
 
 # ------------------------------------------------------------------------------
 # Parsing helpers
 # ------------------------------------------------------------------------------
 
-def _normalise_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [str(c).strip().lower() for c in df.columns]
-    return df
+def _normalise_columns(columns: Iterable[object]) -> List[str]:
+    return [str(c).strip().lower() for c in columns]
 
-def _pick_first_present(df: pd.DataFrame, aliases: list[str]) -> str:
-    for name in aliases:
-        if name in df.columns:
-            return name
-    raise ValueError(f"None of the expected columns found. Tried: {aliases}. Actual: {list(df.columns)}")
+# The header row is searched for within this many rows from the top of a sheet
+HEADER_SCAN_ROWS = 50
+
+# Column order of wait_metrics as produced by the parser and loaded by COPY
+WAIT_METRICS_COLUMNS = ["ods_code", "treatment_code", "period_date", "median_weeks", "pct_over_18w", "pct_over_52w"]
+
+# Leading numeric treatment function code, e.g. "110 - Trauma and Orthopaedic"
+_TFC_RE = re.compile(r"^\s*(\d+)\s*-")
+
+# Flexible header aliases seen across releases, keyed by canonical field name
+ALIAS_TABLE: Dict[str, List[str]] = {
+    "ods_code":       ["organisation code", "organisation code (ods)", "provider code", "org code"],
+    "treatment_code": ["treatment function code", "treatment function", "tfc code", "tfc"],
+    "period_date":    ["period ending", "period end", "period", "month", "reporting period"],
+    "median_weeks":   ["median wait", "median wait (weeks)", "median (weeks)", "median weeks"],
+    "pct_over_18w":   ["% waiting > 18 weeks", "% waiting over 18 weeks", "% > 18 weeks", "over 18 weeks (%)"],
+    "pct_over_52w":   ["% waiting > 52 weeks", "% waiting over 52 weeks", "% > 52 weeks", "over 52 weeks (%)"],
+}
+
+def _resolve_columns(columns: Iterable[str]) -> Dict[str, str]:
+    """
+    Map each canonical field in ALIAS_TABLE to the first matching (normalised)
+    column name. Builds the column lookup once instead of scanning per alias.
+    """
+    col_set = {c: c for c in columns}
+    resolved: Dict[str, str] = {}
+    for field, aliases in ALIAS_TABLE.items():
+        for alias in aliases:
+            col = col_set.get(alias)
+            if col is not None:
+                resolved[field] = col
+                break
+        else:
+            raise ValueError(f"None of the expected columns found. Tried: {aliases}. Actual: {list(col_set)}")
+    return resolved
 
 def _find_header_row(df_raw: pd.DataFrame) -> int:
     """
@@ -134,27 +258,41 @@ def _find_header_row(df_raw: pd.DataFrame) -> int:
     Returns the row index to use as header.
     """
     keywords = ["organisation", "treatment", "period", "median", "18", "52"]
-    for i in range(min(50, len(df_raw))):  # only scan top 50 rows
+    for i in range(min(HEADER_SCAN_ROWS, len(df_raw))):  # only scan the top rows
         row_vals = " | ".join([str(v).strip().lower() for v in df_raw.iloc[i].tolist()])
         if all(k in row_vals for k in ["organisation", "treatment", "period", "median"]):
             return i
     # fallback: first non-empty-ish row
-    for i in range(min(50, len(df_raw))):
+    for i in range(min(HEADER_SCAN_ROWS, len(df_raw))):
         non_na = [v for v in df_raw.iloc[i].tolist() if pd.notna(v)]
         if len(non_na) >= 5:
             return i
     return 0  # worst-case fallback
 
-def parse_wlmds_excel(path: str, sheet_name: str) -> Iterable[Tuple[str, str, datetime, float, float, float]]:
+def open_workbook(path: str) -> openpyxl.Workbook:
+    """
+    Open an .xlsx in openpyxl's read-only, data-only mode, which skips
+    styles/formulas and streams worksheet XML instead of loading every cell
+    object into memory. Callers must close() the returned workbook.
+    """
+    return openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+
+def parse_wlmds_excel(wb: openpyxl.Workbook, sheet_name: str) -> pd.DataFrame:
     """
-    Parse a WLMDS Excel sheet into:
+    Parse a sheet of an open WLMDS workbook into a DataFrame with columns:
       (ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w)
     Robust to multi-row headers and header-name variations.
     """
-    logging.info("Parsing Excel: %s (sheet: %s)", path, sheet_name)
+    logging.info("Parsing Excel sheet: %s", sheet_name)
 
-    # Read without assuming header row
-    raw = pd.read_excel(path, sheet_name=sheet_name, header=None, engine="openpyxl")
+    ws = wb[sheet_name]
+    # Read-only sheets trust the file's <dimension> tag, which some exports
+    # leave stale (e.g. "A1"); recompute the bounds from the data instead.
+    ws.reset_dimensions()
+
+    # Read the top of the sheet without assuming a header row.
+    raw = pd.DataFrame(ws.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True))
 
     hdr_idx = _find_header_row(raw)
     headers = raw.iloc[hdr_idx].tolist()
@@ -172,55 +310,65 @@ def parse_wlmds_excel(path: str, sheet_name: str) -> Iterable[Tuple[str, str, da
             h = f"{base} {counts[base]}"
         fixed_headers.append(h)
         last_seen = base
-
-    df = raw.iloc[hdr_idx + 1:].copy()
-    df.columns = fixed_headers
-    df = _normalise_columns(df)
-
-    # Flexible header aliases seen across releases
-    ods_aliases    = ["organisation code", "organisation code (ods)", "provider code", "org code"]
-    tfn_aliases    = ["treatment function code", "treatment function", "tfc code", "tfc"]
-    period_aliases = ["period ending", "period end", "period", "month", "reporting period"]
-    median_aliases = ["median wait", "median wait (weeks)", "median (weeks)", "median weeks"]
-    gt18_aliases   = ["% waiting > 18 weeks", "% waiting over 18 weeks", "% > 18 weeks", "over 18 weeks (%)"]
-    gt52_aliases   = ["% waiting > 52 weeks", "% waiting over 52 weeks", "% > 52 weeks", "over 52 weeks (%)"]
-
-    ods_col  = _pick_first_present(df, ods_aliases)
-    tfn_col  = _pick_first_present(df, tfn_aliases)
-    per_col  = _pick_first_present(df, period_aliases)
-    med_col  = _pick_first_present(df, median_aliases)
-    gt18_col = _pick_first_present(df, gt18_aliases)
-    gt52_col = _pick_first_present(df, gt52_aliases)
+    names = _normalise_columns(fixed_headers)
+
+    cols = _resolve_columns(names)
+    ods_col  = cols["ods_code"]
+    tfn_col  = cols["treatment_code"]
+    per_col  = cols["period_date"]
+    med_col  = cols["median_weeks"]
+    gt18_col = cols["pct_over_18w"]
+    gt52_col = cols["pct_over_52w"]
+
+    # Only materialise the six columns we use (the sheet carries many more).
+    # iter_rows pads each row up to max_col, so positional picks are safe;
+    # openpyxl rows are 1-based, hence the +2 to start below the header.
+    positions = [names.index(c) for c in cols.values()]
+    pick = operator.itemgetter(*positions)
+    data = ws.iter_rows(min_row=hdr_idx + 2, max_col=max(positions) + 1, values_only=True)
+    df = pd.DataFrame((pick(row) for row in data), columns=list(cols.values()))
 
     # Clean types
-    df[per_col] = pd.to_datetime(df[per_col], errors="coerce")
+    # period_date is a DATE column, so drop any time of day here; otherwise two
+    # rows on the same day survive the dedup below and collide in the merge.
+    df[per_col] = pd.to_datetime(df[per_col], errors="coerce").dt.normalize()
     df = df.dropna(subset=[per_col])
 
-    def _to_float(v) -> float:
-        try:
-            return float(v)
-        except Exception:
-            return float("nan")
+    # Work on whole columns rather than iterating rows; iterrows builds a
+    # Series per row and dominates the parse time on large sheets. Arrow-backed
+    # dtypes keep the string/float work in C instead of on Python objects.
+    ods = df[ods_col].astype("string[pyarrow]").str.strip()
+    tfc_raw = df[tfn_col].astype("string[pyarrow]").str.strip()
+    # "110 - Trauma and Orthopaedic" -> "110"; other codes are kept as-is
+    code = tfc_raw.str.extract(_TFC_RE, expand=False).fillna(tfc_raw)
 
-    records: list[Tuple[str, str, datetime, float, float, float]] = []
-    for _, row in df.iterrows():
-        ods_code = str(row[ods_col]).strip()
-        treatment_code = str(row[tfn_col]).strip()
-        if "-" in treatment_code and treatment_code.split("-")[0].strip().isdigit():
-            treatment_code = treatment_code.split("-")[0].strip()
+    def _to_float_array(col: str):
+        values = pd.to_numeric(df[col], errors="coerce", dtype_backend="pyarrow")
+        return values.to_numpy(dtype=float, na_value=float("nan"))
 
-        period_date   = pd.to_datetime(row[per_col]).to_pydatetime()
-        median_weeks  = _to_float(row[med_col])
-        pct_over_18w  = _to_float(row[gt18_col])
-        pct_over_52w  = _to_float(row[gt52_col])
+    median_weeks = _to_float_array(med_col)
+    pct_over_18w = _to_float_array(gt18_col)
+    pct_over_52w = _to_float_array(gt52_col)
 
-        if not ods_code or not treatment_code:
-            continue
+    mask = (ods.notna() & code.notna() & (ods != "") & (code != "")).to_numpy(dtype=bool, na_value=False)
 
-        records.append((ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w))
+    out = pd.DataFrame({
+        "ods_code": ods,
+        "treatment_code": code,
+        "period_date": df[per_col],
+        "median_weeks": median_weeks,
+        "pct_over_18w": pct_over_18w,
+        "pct_over_52w": pct_over_52w,
+    })[mask]
+    # Sheets sometimes restate a row; keep the last one per primary key so the
+    # upsert does not hit "ON CONFLICT DO UPDATE command cannot affect row a
+    # second time".
+    out = out.drop_duplicates(subset=WAIT_METRICS_COLUMNS[:3], keep="last")
 
-    logging.info("Parsed %d rows from sheet '%s' (header row %d)", len(records), sheet_name, hdr_idx)
-    return records
+    out = out.reset_index(drop=True)
+
+    logging.info("Parsed %d rows from sheet '%s' (header row %d)", len(out), sheet_name, hdr_idx)
+    return out
 
 
 
@@ -238,36 +386,99 @@ CREATE TABLE IF NOT EXISTS wait_metrics (
     pct_over_52w DOUBLE PRECISION NOT NULL,
     PRIMARY KEY (ods_code, treatment_code, period_date)
 );
+-- Serves latest-period-per-treatment lookups, including the rebuild of
+-- wait_metrics_latest below, as index-only scans. The primary key covers
+-- trend lookups.
+CREATE INDEX IF NOT EXISTS wm_treatment_period_median
+    ON wait_metrics (treatment_code, period_date DESC, median_weeks)
+    INCLUDE (ods_code, pct_over_18w, pct_over_52w);
+-- The API's search reads only the latest period per treatment, so those rows
+-- are materialised into a small view that is refreshed after each load. The
+-- API creates the same view at startup; keep the two definitions in sync.
+CREATE MATERIALIZED VIEW IF NOT EXISTS wait_metrics_latest AS
+SELECT treatment_code, ods_code, median_weeks, pct_over_18w, pct_over_52w
+FROM wait_metrics
+WHERE period_date = (
+    SELECT MAX(latest.period_date)
+    FROM wait_metrics AS latest
+    WHERE latest.treatment_code = wait_metrics.treatment_code
+);
+CREATE UNIQUE INDEX IF NOT EXISTS wait_metrics_latest_treatment_ods
+    ON wait_metrics_latest (treatment_code, ods_code);
 """
 
 
-def ensure_table(conn) -> None:
-    with conn.cursor() as cur:
-        cur.execute(CREATE_TABLE_SQL)
-    conn.commit()
+# Rows are bulk-loaded into a per-session staging table with COPY and then
+# merged into wait_metrics with a single INSERT … ON CONFLICT statement.
+# Temp tables are never WAL-logged, so the merge is the only step that writes
+# WAL; the load is re-runnable, so it also skips waiting for the WAL flush.
+CREATE_STAGE_SQL = """
+SET LOCAL synchronous_commit = off;
+CREATE TEMP TABLE wait_metrics_stage (LIKE wait_metrics INCLUDING DEFAULTS) ON COMMIT DROP;
+"""
+
+COPY_STAGE_SQL = """
+COPY wait_metrics_stage
+(ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w)
+FROM STDIN WITH (FORMAT csv)
+"""
+
+MERGE_STAGE_SQL = """
+INSERT INTO wait_metrics
+(ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w)
+SELECT ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w
+FROM wait_metrics_stage
+ON CONFLICT (ods_code, treatment_code, period_date) DO UPDATE
+SET median_weeks = EXCLUDED.median_weeks,
+    pct_over_18w = EXCLUDED.pct_over_18w,
+    pct_over_52w = EXCLUDED.pct_over_52w;
+"""
 
+# CONCURRENTLY keeps the view readable by the API while it is rebuilt; it
+# relies on the unique index above.
+REFRESH_LATEST_SQL = "REFRESH MATERIALIZED VIEW CONCURRENTLY wait_metrics_latest;"
 
-def upsert_wait_metrics(records: Iterable[Tuple[str, str, datetime, float, float, float]], database_url: str) -> None:
-    recs = list(records)  # materialize once; also allows len()
-    logging.info("Upserting %d records into wait_metrics …", len(recs))
-    if not recs:
+
+def _frame_to_csv(df: pd.DataFrame) -> io.BytesIO:
+    """
+    Serialise a wait_metrics frame as CSV bytes for COPY using pyarrow's C++
+    writer. Missing floats are written as 'nan', which Postgres reads as NaN,
+    rather than NULL which the NOT NULL columns would reject.
+    """
+    table = pa.Table.from_pandas(df[WAIT_METRICS_COLUMNS], preserve_index=False)
+    table = table.set_column(2, "period_date", pc.cast(table.column("period_date"), pa.date32()))
+    for name in WAIT_METRICS_COLUMNS[3:]:
+        i = table.schema.get_field_index(name)
+        filled = pc.fill_null(pc.cast(table.column(i), pa.float64()), float("nan"))
+        table = table.set_column(i, name, filled)
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink, write_options=pa_csv.WriteOptions(include_header=False))
+    return io.BytesIO(sink.getvalue().to_pybytes())
+
+
+def upsert_wait_metrics(
+    records: Union[pd.DataFrame, Iterable[Tuple[str, str, datetime, float, float, float]]],
+    database_url: str,
+) -> None:
+    # parse_wlmds_excel returns a DataFrame; plain record tuples are still accepted
+    if isinstance(records, pd.DataFrame):
+        df = records
+    else:
+        df = pd.DataFrame(list(records), columns=WAIT_METRICS_COLUMNS)
+    logging.info("Upserting %d records into wait_metrics …", len(df))
+    if df.empty:
         logging.warning("No records to upsert; skipping.")
         return
 
     conn = psycopg2.connect(database_url)
     try:
-        ensure_table(conn)
+        # Everything below runs in one transaction: table setup is sent in a
+        # single statement batch, followed by the COPY, the merge and the
+        # refresh of wait_metrics_latest.
         with conn.cursor() as cur:
-            insert_sql = """
-                INSERT INTO wait_metrics
-                (ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w)
-                VALUES %s
-                ON CONFLICT (ods_code, treatment_code, period_date) DO UPDATE
-                SET median_weeks = EXCLUDED.median_weeks,
-                    pct_over_18w = EXCLUDED.pct_over_18w,
-                    pct_over_52w = EXCLUDED.pct_over_52w;
-            """
-            execute_values(cur, insert_sql, recs)
+            cur.execute(CREATE_TABLE_SQL + CREATE_STAGE_SQL)
+            cur.copy_expert(COPY_STAGE_SQL, _frame_to_csv(df))
+            cur.execute(MERGE_STAGE_SQL + REFRESH_LATEST_SQL)
         conn.commit()
         logging.info("Upsert completed successfully.")
     finally:
@@ -292,12 +503,15 @@ def main() -> None:
 
     tmp_path = download_to_temp(wlmds_url)
     try:
-        xls = pd.ExcelFile(tmp_path)
-        sheet_name = choose_provider_sheet(xls, wlmds_sheet)
-        logging.info("Using sheet: %s (available: %s)", sheet_name, xls.sheet_names)
+        wb = open_workbook(tmp_path)
+        try:
+            sheet_name = choose_provider_sheet(wb, wlmds_sheet)
+            logging.info("Using sheet: %s (available: %s)", sheet_name, wb.sheetnames)
 
-        records = list(parse_wlmds_excel(tmp_path, sheet_name=sheet_name))
-        upsert_wait_metrics(records, database_url)
+            metrics = parse_wlmds_excel(wb, sheet_name=sheet_name)
+        finally:
+            wb.close()
+        upsert_wait_metrics(metrics, database_url)
     finally:
         try:
             os.remove(tmp_path)
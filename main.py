@@ -1,21 +1,131 @@
 
 import os
-import requests
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException, Depends
+import math
+import asyncio
+import logging
+import time
+from contextlib import aclosing, asynccontextmanager
+import httpx
+import numpy as np
+from async_lru import alru_cache
+from collections import deque
+from typing import AsyncIterator, Iterator, Optional, List
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2  # used to query the wait_metrics table for real wait times
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+import asyncpg  # used to query the wait_metrics table for real wait times
+from pydantic import BaseModel, Field, TypeAdapter
+from pydantic_core import to_json
 
-app = FastAPI()
+
+# In production the app runs as several processes, each with its own event loop
+# and pool, e.g.
+#
+#   gunicorn main:app -k uvicorn_worker.UvicornWorker --workers $(nproc)
+#
+# with DATABASE_URL pointing at a PgBouncer in transaction-pooling mode so the
+# workers' client connections share a small set of server connections. Keep
+# workers x PG_POOL_MAX_SIZE within PgBouncer's max_client_conn. Transaction
+# pooling breaks asyncpg's named prepared statements unless PgBouncer has
+# max_prepared_statements set (1.21+); otherwise set PG_STATEMENT_CACHE_SIZE=0.
+PG_POOL_MAX_SIZE = int(os.environ.get("PG_POOL_MAX_SIZE", "20"))
+PG_STATEMENT_CACHE_SIZE = int(os.environ.get("PG_STATEMENT_CACHE_SIZE", "100"))
+# After a failed attempt to create the pool, wait this long before trying again
+PG_CONNECT_RETRY_SECONDS = 10.0
+# Connect timeout for creating the pool, so a request that triggers a retry
+# against an unreachable Postgres is not held for asyncpg's 60 s default
+PG_CONNECT_TIMEOUT_SECONDS = 5.0
+
+
+async def ensure_pg_pool(app: FastAPI) -> Optional[asyncpg.Pool]:
+    """
+    Return the shared asyncpg pool, creating it on first use. If Postgres is
+    unreachable the pool stays None (so endpoints serve the static demo data)
+    and creation is retried at most every PG_CONNECT_RETRY_SECONDS. The
+    request that triggers a retry waits up to PG_CONNECT_TIMEOUT_SECONDS for
+    it; concurrent requests do not wait and see no pool meanwhile.
+    """
+    state = app.state
+    if state.pg_pool is not None or not state.db_url or state.pg_pool_lock.locked():
+        return state.pg_pool
+    async with state.pg_pool_lock:
+        if state.pg_pool is None and time.monotonic() >= state.pg_retry_at:
+            try:
+                state.pg_pool = await asyncpg.create_pool(
+                    state.db_url,
+                    min_size=2,
+                    max_size=PG_POOL_MAX_SIZE,
+                    command_timeout=30,
+                    timeout=PG_CONNECT_TIMEOUT_SECONDS,
+                    # per-connection prepared statement cache (see LATEST_WAIT_METRICS_SQL)
+                    statement_cache_size=PG_STATEMENT_CACHE_SIZE,
+                )
+            except Exception:
+                state.pg_retry_at = time.monotonic() + PG_CONNECT_RETRY_SECONDS
+                logging.exception("Could not connect to Postgres; serving static demo data")
+                return None
+            try:
+                await state.pg_pool.execute(CREATE_ALERTS_TABLE_SQL)
+            except Exception:
+                logging.exception("Could not create the alerts table; /api/alerts will fail until it exists")
+            try:
+                await state.pg_pool.execute(CREATE_WAIT_METRICS_LATEST_SQL)
+            except asyncpg.UndefinedTableError:
+                logging.warning("wait_metrics does not exist yet; searches serve static demo data until the ETL loader has run")
+            except Exception:
+                logging.exception("Could not create wait_metrics_latest; searches serve static demo data")
+    return state.pg_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the process-wide outbound HTTP client and asyncpg pool at startup
+    and close them on shutdown. If DATABASE_URL is not configured the pool is
+    None and the endpoints serve the static demo data instead; if Postgres is
+    unreachable at startup, ensure_pg_pool keeps retrying on later requests.
+    """
+    # One shared client so outbound calls reuse keep-alive (HTTP/2 where the
+    # upstream supports it) connections instead of paying a TCP+TLS handshake
+    # per request, and so the async endpoints await network I/O rather than
+    # blocking the event loop on it.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+    app.state.pg_pool = None
+    app.state.pg_pool_lock = asyncio.Lock()
+    app.state.pg_retry_at = 0.0
+    app.state.db_url = os.environ.get("DATABASE_URL")
+    await ensure_pg_pool(app)
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        if app.state.pg_pool is not None:
+            await app.state.pg_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# CORS_ORIGINS is a comma-separated list of frontend origins. Credentials are
+# only allowed for an explicit list; without one any origin may call the API
+# anonymously. Preflight responses are cacheable by the browser for max_age.
+CORS_ORIGINS = [o.strip() for o in os.environ.get("CORS_ORIGINS", "").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=CORS_ORIGINS or ["*"],
+    allow_credentials=bool(CORS_ORIGINS),
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
+# Search results and trend arrays are repetitive JSON; compress anything
+# larger than a small response.
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
 # -----------------------
 # Waitlist Radar models
@@ -43,8 +153,8 @@ class SearchResult(BaseModel):
 
 class AlertRequest(BaseModel):
     """
-    Represents an alert subscription request. In a real implementation
-    this would be persisted to a database for later processing.
+    Represents an alert subscription request. Persisted to the `alerts` table
+    when a database is configured.
     """
     email: str
     postcode: str
@@ -52,7 +162,41 @@ class AlertRequest(BaseModel):
     threshold_weeks: float
 
 
-# In-memory store for alert requests. This is a placeholder until a database is introduced.
+class LookupResult(BaseModel):
+    """
+    Power-cut risk summary for a postcode, derived from nearby UKPN faults.
+    """
+    postcode: str
+    latitude: float
+    longitude: float
+    fault_count: int
+    risk_score: str
+
+
+# Upper bound on postcodes per /api/lookup_bulk call (ten postcodes.io
+# batches), so one request cannot fan out into unbounded upstream calls.
+MAX_BULK_POSTCODES = 1000
+
+
+class BulkLookupRequest(BaseModel):
+    """
+    A batch of postcodes to geocode in one call.
+    """
+    postcodes: List[str] = Field(max_length=MAX_BULK_POSTCODES)
+
+
+class GeocodeResult(BaseModel):
+    """
+    Coordinates for one requested postcode; latitude/longitude are None when
+    postcodes.io does not recognise it.
+    """
+    postcode: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+# In-memory store for alert requests, used only when no database is configured
+# (demo mode). With a database, alerts are written to the `alerts` table.
 ALERTS: List[AlertRequest] = []
 
 # Static list of treatments for demonstration purposes. Replace with a database query in production.
@@ -66,6 +210,7 @@ STATIC_TREATMENTS: List[Treatment] = [
 
 # Static search results for demonstration purposes. In production, this should query a database
 # with current waiting list information, CQC ratings and geospatial queries.
+# Endpoints return this list by reference (no per-request copy), so treat it as read-only.
 STATIC_RESULTS: List[SearchResult] = [
     SearchResult(
         ods_code="RJZ",
@@ -97,6 +242,19 @@ class WaitTrend(BaseModel):
     periods: list[str]
     median_weeks: list[float]
 
+
+# Upper bound on providers per /api/trends_bulk call, which keeps the single
+# ANY($1) query and the response it builds bounded.
+MAX_BULK_TRENDS = 500
+
+
+class BulkTrendsRequest(BaseModel):
+    """
+    A batch of providers whose trends for one treatment are fetched together.
+    """
+    ods_codes: list[str] = Field(max_length=MAX_BULK_TRENDS)
+    treatment: str
+
 # Static trending data for demonstration purposes. In a production system this would be loaded
 # from official NHS datasets (e.g. RTT or WLMDS) and refreshed regularly.
 STATIC_TRENDS: list[WaitTrend] = [
@@ -126,62 +284,151 @@ STATIC_TRENDS: list[WaitTrend] = [
     ),
 ]
 
+# The static payloads never change, so their exact JSON response bodies are
+# rendered once at import and returned verbatim, skipping per-request Pydantic
+# validation and serialisation.
+JSON_MEDIA_TYPE = "application/json"
+_HEALTH_JSON = b'{"ok":true}'
+_TREATMENTS_JSON = TypeAdapter(List[Treatment]).dump_json(STATIC_TREATMENTS)
+_STATIC_RESULTS_JSON = TypeAdapter(List[SearchResult]).dump_json(STATIC_RESULTS)
+_STATIC_TRENDS_JSON: dict[tuple[str, str], bytes] = {
+    (trend.ods_code, trend.treatment): TypeAdapter(List[WaitTrend]).dump_json([trend])
+    for trend in STATIC_TRENDS
+}
 
 
 POSTCODES_IO_URL = "https://api.postcodes.io/postcodes/"
 UKPN_FAULTS_API = "https://ukpowernetworks.opendatasoft.com/api/records/1.0/search/"
 
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """FastAPI dependency returning the shared outbound HTTP client."""
+    return request.app.state.http
+
+
+# postcodes.io bulk endpoint accepts at most this many postcodes per request
+POSTCODES_IO_BULK_LIMIT = 100
+
+
+def normalise_postcode(postcode: str) -> str:
+    """Canonical cache key for a postcode: uppercase with all whitespace removed."""
+    return "".join(postcode.split()).upper()
+
+
+async def geocode_postcode(http: httpx.AsyncClient, postcode: str) -> tuple[float, float]:
+    """
+    Return (latitude, longitude) for a UK postcode via postcodes.io. Results are
+    effectively immutable, so successful lookups are cached in-process, keyed by
+    the normalised postcode so "ls1 3ex" and "LS13EX" share one entry; failed
+    lookups raise and are not cached.
+    """
+    return await _geocode_normalised(http, normalise_postcode(postcode))
+
+
+@alru_cache(maxsize=100_000)
+async def _geocode_normalised(http: httpx.AsyncClient, postcode: str) -> tuple[float, float]:
+    res = await http.get(f"{POSTCODES_IO_URL}{postcode}")
+    if res.status_code != 200:
+        raise HTTPException(status_code=400, detail="Invalid postcode")
+    data = res.json()
+    return data["result"]["latitude"], data["result"]["longitude"]
+
 # ---------------------------------------------------------------------------
 # Database helpers
 #
 # The WLMDS loader script populates a `wait_metrics` table with columns:
 #   ods_code, treatment_code, period_date, median_weeks, pct_over_18w, pct_over_52w
-# These helpers provide a simple way to query the latest waiting time metrics
-# without keeping a persistent connection open. In production you may want to
-# use an async driver like asyncpg and connection pooling for efficiency.
-
-
-def get_db_connection():
-    """Return a new psycopg2 connection using the DATABASE_URL env variable."""
-    db_url = os.environ.get("DATABASE_URL")
-    if not db_url:
-        raise RuntimeError("DATABASE_URL environment variable is not configured")
-    return psycopg2.connect(db_url)
-
-
-def fetch_latest_wait_metrics(treatment_code: str):
+# Queries go through the asyncpg pool created in `lifespan`, so the async
+# endpoints never block the event loop and reuse open connections.
+
+
+# asyncpg prepares each distinct query text once per connection and keeps the
+# prepared statement in its per-connection statement cache, so repeated calls
+# skip parse/plan. Keeping the hot queries as module constants guarantees every
+# call site sends the identical text and therefore hits that cache.
+
+# wait_metrics_latest is a materialised view holding only the latest period of
+# each treatment. The API creates it at startup if wait_metrics exists, so
+# deployments that predate it need no ETL run; the ETL loader creates it too
+# (keep both definitions in sync) and refreshes it after every load.
+CREATE_WAIT_METRICS_LATEST_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS wait_metrics_latest AS
+SELECT treatment_code, ods_code, median_weeks, pct_over_18w, pct_over_52w
+FROM wait_metrics
+WHERE period_date = (
+    SELECT MAX(latest.period_date)
+    FROM wait_metrics AS latest
+    WHERE latest.treatment_code = wait_metrics.treatment_code
+);
+CREATE UNIQUE INDEX IF NOT EXISTS wait_metrics_latest_treatment_ods
+    ON wait_metrics_latest (treatment_code, ods_code);
+"""
+
+LATEST_WAIT_METRICS_SQL = """
+SELECT ods_code, median_weeks, pct_over_18w, pct_over_52w
+FROM wait_metrics_latest
+WHERE treatment_code = $1
+ORDER BY median_weeks ASC
+"""
+
+TREND_SQL = """
+SELECT period_date, median_weeks
+FROM wait_metrics
+WHERE ods_code = $1 AND treatment_code = $2
+ORDER BY period_date ASC
+"""
+
+BULK_TREND_SQL = """
+SELECT ods_code, period_date, median_weeks
+FROM wait_metrics
+WHERE ods_code = ANY($1::text[]) AND treatment_code = $2
+ORDER BY array_position($1::text[], ods_code), period_date ASC
+"""
+
+
+CREATE_ALERTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id BIGSERIAL PRIMARY KEY,
+    email TEXT NOT NULL,
+    postcode TEXT NOT NULL,
+    treatment TEXT NOT NULL,
+    threshold_weeks DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+INSERT_ALERT_SQL = """
+INSERT INTO alerts (email, postcode, treatment, threshold_weeks)
+VALUES ($1, $2, $3, $4)
+RETURNING id
+"""
+
+
+async def get_pg_pool(request: Request) -> Optional[asyncpg.Pool]:
+    """FastAPI dependency returning the shared pool, or None if no database is available."""
+    return await ensure_pg_pool(request.app)
+
+
+# wait_metrics only changes when the ETL loads a new monthly release, so query
+# results are cached in-process. Entries expire after the TTL; failed queries
+# are not cached.
+
+@alru_cache(maxsize=256, ttl=300)
+async def fetch_latest_wait_metrics(pool: asyncpg.Pool, treatment_code: str):
     """
-    Fetch a list of tuples (ods_code, median_weeks, pct_over_18w, pct_over_52w)
+    Fetch a list of records (ods_code, median_weeks, pct_over_18w, pct_over_52w)
     for the most recent period_date for the given treatment_code. Returns an
     empty list if no records exist.
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            # Find the most recent period for this treatment
-            cur.execute(
-                """
-                SELECT MAX(period_date)
-                FROM wait_metrics
-                WHERE treatment_code = %s
-                """,
-                (treatment_code,),
-            )
-            latest = cur.fetchone()[0]
-            if not latest:
-                return []
-            cur.execute(
-                """
-                SELECT ods_code, median_weeks, pct_over_18w, pct_over_52w
-                FROM wait_metrics
-                WHERE treatment_code = %s AND period_date = %s
-                ORDER BY median_weeks ASC
-                """,
-                (treatment_code, latest),
-            )
-            return cur.fetchall()
-    finally:
-        conn.close()
+    return await pool.fetch(LATEST_WAIT_METRICS_SQL, treatment_code)
+
+
+@alru_cache(maxsize=4096, ttl=3600)
+async def fetch_wait_trend(pool: asyncpg.Pool, ods_code: str, treatment_code: str):
+    """
+    Fetch (period_date, median_weeks) records for one provider and treatment,
+    oldest first.
+    """
+    return await pool.fetch(TREND_SQL, ods_code, treatment_code)
 
 
 # Basic provider metadata. For demonstration this includes only a couple of hospitals
@@ -202,23 +449,50 @@ PROVIDER_INFO = {
 }
 
 
+# PROVIDER_INFO laid out as parallel arrays (coordinates pre-converted to
+# radians) once at import, so a search gathers coordinates by integer index
+# instead of doing per-row dict lookups and radians() calls. The extra last
+# slot is a NaN sentinel used for providers without known coordinates.
+_PROVIDER_CODES = list(PROVIDER_INFO)
+_PROVIDER_INDEX = {code: i for i, code in enumerate(_PROVIDER_CODES)}
+_UNKNOWN_PROVIDER = len(_PROVIDER_CODES)
+_PROVIDER_NAMES = [PROVIDER_INFO[code]["name"] for code in _PROVIDER_CODES]
+_PROVIDER_LAT_RAD = np.radians(
+    [PROVIDER_INFO[code].get("lat", np.nan) for code in _PROVIDER_CODES] + [np.nan]
+)
+_PROVIDER_LON_RAD = np.radians(
+    [PROVIDER_INFO[code].get("lon", np.nan) for code in _PROVIDER_CODES] + [np.nan]
+)
+_PROVIDER_COS_LAT = np.cos(_PROVIDER_LAT_RAD)
 
-@app.post("/lookup")
-async def lookup_postcode(postcode: str):
-    res = requests.get(f"{POSTCODES_IO_URL}{postcode}")
-    if res.status_code != 200:
-        raise HTTPException(status_code=400, detail="Invalid postcode")
+EARTH_RADIUS_KM = 6371.0
 
-    data = res.json()
-    lat = data["result"]["latitude"]
-    lon = data["result"]["longitude"]
+
+def haversine_km(
+    lat: float, lon: float, lat2: np.ndarray, lon2: np.ndarray, cos_lat2: np.ndarray
+) -> np.ndarray:
+    """
+    Great-circle distance in km from (lat, lon), in degrees, to every point in
+    lat2/lon2, in radians, computed as one vectorised NumPy expression.
+    cos_lat2 is cos(lat2), which callers precompute once per provider.
+    """
+    lat1 = math.radians(lat)
+    lon1 = math.radians(lon)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * cos_lat2 * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+
+@app.post("/lookup", response_model=LookupResult)
+async def lookup_postcode(postcode: str, http: httpx.AsyncClient = Depends(get_http_client)) -> LookupResult:
+    lat, lon = await geocode_postcode(http, postcode)
 
     params = {
         "dataset": "faults-and-interruptions",
         "geofilter.distance": f"{lat},{lon},1000",
         "rows": 100
     }
-    faults_res = requests.get(UKPN_FAULTS_API, params=params)
+    faults_res = await http.get(UKPN_FAULTS_API, params=params)
     if faults_res.status_code != 200:
         raise HTTPException(status_code=500, detail="Error fetching UKPN data")
 
@@ -232,43 +506,95 @@ async def lookup_postcode(postcode: str):
     else:
         score = "High Risk"
 
-    return {
-        "postcode": postcode,
-        "latitude": lat,
-        "longitude": lon,
-        "fault_count": fault_count,
-        "risk_score": score
-    }
+    return LookupResult(
+        postcode=postcode,
+        latitude=lat,
+        longitude=lon,
+        fault_count=fault_count,
+        risk_score=score,
+    )
+
+async def geocode_postcodes_bulk(
+    http: httpx.AsyncClient, postcodes: List[str]
+) -> dict[str, Optional[tuple[float, float]]]:
+    """
+    Geocode many postcodes with postcodes.io's bulk endpoint, one request per
+    POSTCODES_IO_BULK_LIMIT postcodes (sent concurrently) instead of one per
+    postcode. Returns {normalised postcode: (lat, lon) or None if unknown}.
+    """
+    unique = list(dict.fromkeys(normalise_postcode(pc) for pc in postcodes))
+    batches = [
+        unique[i:i + POSTCODES_IO_BULK_LIMIT]
+        for i in range(0, len(unique), POSTCODES_IO_BULK_LIMIT)
+    ]
+    responses = await asyncio.gather(
+        *(http.post(POSTCODES_IO_URL.rstrip("/"), json={"postcodes": batch}) for batch in batches)
+    )
+    coords: dict[str, Optional[tuple[float, float]]] = {}
+    for res in responses:
+        if res.status_code != 200:
+            raise HTTPException(status_code=500, detail="Error fetching postcodes.io data")
+        for item in res.json()["result"]:
+            result = item.get("result")
+            coords[normalise_postcode(item["query"])] = (
+                (result["latitude"], result["longitude"]) if result else None
+            )
+    return coords
+
+
+@app.post("/api/lookup_bulk", response_model=List[GeocodeResult])
+async def lookup_bulk(
+    body: BulkLookupRequest,
+    http: httpx.AsyncClient = Depends(get_http_client),
+) -> List[GeocodeResult]:
+    """
+    Geocodes a list of postcodes in as few upstream calls as possible. Results
+    are returned in request order; unknown postcodes have null coordinates.
+    """
+    coords = await geocode_postcodes_bulk(http, body.postcodes)
+    results: list[GeocodeResult] = []
+    for postcode in body.postcodes:
+        found = coords.get(normalise_postcode(postcode))
+        results.append(
+            GeocodeResult(
+                postcode=postcode,
+                latitude=found[0] if found else None,
+                longitude=found[1] if found else None,
+            )
+        )
+    return results
 
 # -----------------------------------------
 # Waitlist Radar API endpoints
 # -----------------------------------------
 
-@app.get("/api/health")
-async def health() -> dict:
+@app.get("/api/health", responses={200: {"content": {JSON_MEDIA_TYPE: {"example": {"ok": True}}}}})
+async def health() -> Response:
     """
     Health-check endpoint used by the frontend to verify the API is reachable.
     """
-    return {"ok": True}
+    return Response(content=_HEALTH_JSON, media_type=JSON_MEDIA_TYPE)
 
 
-@app.get("/api/treatments", response_model=List[Treatment])
-async def get_treatments() -> List[Treatment]:
+@app.get("/api/treatments", responses={200: {"model": List[Treatment]}})
+async def get_treatments() -> Response:
     """
     Returns a list of available treatments/specialties. This version returns
     a static list for demonstration but should be replaced with a database query.
     """
-    return STATIC_TREATMENTS
+    return Response(content=_TREATMENTS_JSON, media_type=JSON_MEDIA_TYPE)
 
 
-@app.get("/api/search", response_model=List[SearchResult])
+@app.get("/api/search", responses={200: {"model": List[SearchResult]}})
 async def search(
     postcode: Optional[str] = None,
     lat: Optional[float] = None,
     lon: Optional[float] = None,
     treatment: Optional[str] = None,
     radius_km: float = 50.0,
-) -> List[SearchResult]:
+    pool: Optional[asyncpg.Pool] = Depends(get_pg_pool),
+    http: httpx.AsyncClient = Depends(get_http_client),
+) -> Response:
     """
     Searches for providers within a given radius of a postcode or lat/lon and returns
     wait time information. This is a simplified version that returns static results
@@ -287,113 +613,251 @@ async def search(
 
     # If latitude/longitude are missing but a postcode is provided, look up the coordinates.
     if (lat is None or lon is None) and postcode:
-        res = requests.get(f"{POSTCODES_IO_URL}{postcode}")
-        if res.status_code != 200:
-            raise HTTPException(status_code=400, detail="Invalid postcode")
-        data = res.json()
-        lat = data["result"]["latitude"]
-        lon = data["result"]["longitude"]
-
-           # ---------------------------------------------------------------------
-        # Fetch real wait time data if a treatment code has been specified and
-        # the database is configured. If DATABASE_URL is missing or the query
-        # returns no results, fall back to STATIC_RESULTS. This allows the
-        # frontend to continue functioning with demo data while the ETL runs
-        # asynchronously to populate the wait_metrics table.
-        if treatment:
-            try:
-                records = fetch_latest_wait_metrics(treatment.upper())
-            except Exception:
-                records = []
-            if records:
-                # Build SearchResult objects from DB data. Distance is not
-                # calculated in this simple example; for accurate distances
-                # you'd join on provider coordinates and compute haversine.
-                enriched: list[SearchResult] = []
-                for ods_code, median_weeks, _, pct_over_52w in records:
-                    info = PROVIDER_INFO.get(ods_code, {})
-                    name = info.get("name", ods_code)
-                    # Use provider coordinates if available to compute distance
-                    if info.get("lat") and info.get("lon") and lat is not None and lon is not None:
-                        # Haversine formula for distance in km
-                        from math import radians, cos, sin, sqrt, atan2
-
-                        R = 6371.0
-                        lat1 = radians(lat)
-                        lon1 = radians(lon)
-                        lat2 = radians(info["lat"])
-                        lon2 = radians(info["lon"])
-                        dlat = lat2 - lat1
-                        dlon = lon2 - lon1
-                        a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-                        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-                        distance = R * c
-                    else:
-                        distance = 0.0
-                    enriched.append(
-                        SearchResult(
-                            ods_code=ods_code,
-                            name=name,
-                            distance_km=round(distance, 1),
-                            median_weeks=median_weeks,
-                            pct_over_52w=pct_over_52w,
-                            cqc_overall=None,
-                        )
-                    )
-                return enriched
-        # If no treatment specified or DB query yielded nothing, return static sample data
-        return STATIC_RESULTS
+        lat, lon = await geocode_postcode(http, postcode)
+    if lat is None or lon is None:
+        raise HTTPException(status_code=400, detail="postcode or lat/lon required")
+
+    # ---------------------------------------------------------------------
+    # Fetch real wait time data if a treatment code has been specified and
+    # the database is configured. If DATABASE_URL is missing or the query
+    # returns no results, fall back to STATIC_RESULTS. This allows the
+    # frontend to continue functioning with demo data while the ETL runs
+    # asynchronously to populate the wait_metrics table.
+    if treatment and pool is not None:
+        try:
+            records = await fetch_latest_wait_metrics(pool, treatment.upper())
+        except Exception:
+            records = []
+        if records:
+            # Build SearchResult-shaped dicts from DB data and serialise
+            # them directly, skipping per-row model validation. Distances
+            # are computed in one vectorised pass for all providers whose
+            # coordinates are known in PROVIDER_INFO.
+            idx = np.fromiter(
+                (_PROVIDER_INDEX.get(r["ods_code"], _UNKNOWN_PROVIDER) for r in records),
+                dtype=np.intp,
+                count=len(records),
+            )
+            # Providers without known coordinates get NaN and end up at 0.0
+            distances = np.nan_to_num(
+                haversine_km(
+                    lat, lon, _PROVIDER_LAT_RAD[idx], _PROVIDER_LON_RAD[idx], _PROVIDER_COS_LAT[idx]
+                ),
+                nan=0.0,
+            )
+            enriched = [
+                {
+                    "ods_code": ods_code,
+                    "name": _PROVIDER_NAMES[i] if i != _UNKNOWN_PROVIDER else ods_code,
+                    "distance_km": round(distance, 1),
+                    "median_weeks": median_weeks,
+                    "pct_over_52w": pct_over_52w,
+                    "cqc_overall": None,
+                }
+                for (ods_code, median_weeks, _, pct_over_52w), i, distance
+                in zip(records, idx.tolist(), distances.tolist())
+            ]
+            # inf_nan_mode="null" matches how Pydantic serialises NaN floats
+            return Response(
+                content=to_json(enriched, inf_nan_mode="null"), media_type=JSON_MEDIA_TYPE
+            )
+    # If no treatment specified or DB query yielded nothing, return static sample data
+    return Response(content=_STATIC_RESULTS_JSON, media_type=JSON_MEDIA_TYPE)
 
 
 @app.post("/api/alerts")
-async def create_alert(alert: AlertRequest) -> dict:
+async def create_alert(
+    alert: AlertRequest,
+    request: Request,
+    pool: Optional[asyncpg.Pool] = Depends(get_pg_pool),
+) -> dict:
     """
-    Registers an alert for a given postcode and treatment. In production, this would persist
-    the alert request to a database and trigger notifications when conditions are met.
+    Registers an alert for a given postcode and treatment. The alert is stored in the
+    `alerts` table (one INSERT … RETURNING round trip) so it survives restarts and is
+    visible to every worker; without a configured database it is kept in memory for
+    the demo. If a database is configured but unavailable, returns 503 so the client
+    retries rather than having the alert silently dropped.
     """
-    ALERTS.append(alert)
-    return {"status": "created", "alert": alert}
+    if pool is None:
+        if request.app.state.db_url:
+            raise HTTPException(status_code=503, detail="Alert storage is temporarily unavailable")
+        ALERTS.append(alert)
+        return {"status": "created", "id": len(ALERTS), "alert": alert}
+    alert_id = await pool.fetchval(
+        INSERT_ALERT_SQL, alert.email, alert.postcode, alert.treatment, alert.threshold_weeks
+    )
+    return {"status": "created", "id": alert_id, "alert": alert}
 
 # New endpoint to retrieve waiting time trends for a specific provider and treatment
 @app.get("/api/trends", response_model=List[WaitTrend])
-async def get_trends(ods_code: str, treatment: str) -> List[WaitTrend]:
+async def get_trends(
+    ods_code: str,
+    treatment: str,
+    pool: Optional[asyncpg.Pool] = Depends(get_pg_pool),
+) -> List[WaitTrend]:
     """
     Returns wait time trends for a given provider and treatment. The trend is
     computed from all available `wait_metrics` records in the database. If
     no records exist, returns the static demo trend data.
     """
-    try:
-        conn = get_db_connection()
-    except Exception:
-        conn = None
     trends: list[WaitTrend] = []
-    if conn:
+    if pool is not None:
         try:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT period_date, median_weeks
-                    FROM wait_metrics
-                    WHERE ods_code = %s AND treatment_code = %s
-                    ORDER BY period_date ASC
-                    """,
-                    (ods_code, treatment),
+            rows = await fetch_wait_trend(pool, ods_code, treatment)
+        except Exception:
+            rows = []
+        if rows:
+            periods = [r[0].strftime("%Y-%m") for r in rows]
+            medians = [r[1] for r in rows]
+            trends.append(
+                WaitTrend(
+                    ods_code=ods_code,
+                    treatment=treatment,
+                    periods=periods,
+                    median_weeks=medians,
                 )
-                rows = cur.fetchall()
-                if rows:
-                    periods = [r[0].strftime("%Y-%m") for r in rows]
-                    medians = [r[1] for r in rows]
-                    trends.append(
-                        WaitTrend(
-                            ods_code=ods_code,
-                            treatment=treatment,
-                            periods=periods,
-                            median_weeks=medians,
-                        )
-                    )
-        finally:
-            conn.close()
+            )
     if trends:
         return trends
     # fall back to static data for demo
-    return [trend for trend in STATIC_TRENDS if trend.ods_code == ods_code and trend.treatment == treatment]
+    return Response(
+        content=_STATIC_TRENDS_JSON.get((ods_code, treatment), b"[]"),
+        media_type=JSON_MEDIA_TYPE,
+    )
+
+
+# Rows fetched per cursor round trip by /api/trends_bulk. Results that fit in
+# one batch release their connection before the response starts.
+BULK_TREND_BATCH_ROWS = 1000
+
+
+async def _iter_rows(rows: list[asyncpg.Record]) -> AsyncIterator[asyncpg.Record]:
+    for row in rows:
+        yield row
+
+
+async def _stream_rows(
+    pool: asyncpg.Pool,
+    conn: asyncpg.Connection,
+    cursor: asyncpg.cursor.Cursor,
+    batch: list[asyncpg.Record],
+) -> AsyncIterator[asyncpg.Record]:
+    """
+    Yield an already fetched batch and then the rest of the cursor. The
+    connection goes back to the pool when the cursor is exhausted, on error or
+    when the iterator is closed; release() also ends the open transaction.
+    """
+    try:
+        while batch:
+            for row in batch:
+                yield row
+            if len(batch) < BULK_TREND_BATCH_ROWS:
+                break
+            batch = await cursor.fetch(BULK_TREND_BATCH_ROWS)
+    finally:
+        await pool.release(conn)
+
+
+async def _open_bulk_trend_rows(
+    pool: asyncpg.Pool, ods_codes: list[str], treatment: str
+) -> AsyncIterator[asyncpg.Record]:
+    """
+    Start BULK_TREND_SQL on a server-side cursor and fetch its first batch
+    before any response is sent, so connection and query errors are raised
+    here, while the endpoint can still fall back. Returns an iterator over all
+    rows.
+    """
+    conn = await pool.acquire()
+    try:
+        # asyncpg cursors only exist inside a transaction
+        await conn.transaction(readonly=True).start()
+        cursor = await conn.cursor(BULK_TREND_SQL, ods_codes, treatment)
+        batch = await cursor.fetch(BULK_TREND_BATCH_ROWS)
+    except BaseException:
+        await pool.release(conn)
+        raise
+    if len(batch) < BULK_TREND_BATCH_ROWS:
+        await pool.release(conn)
+        return _iter_rows(batch)
+    return _stream_rows(pool, conn, cursor, batch)
+
+
+async def _bulk_trend_items(
+    rows: AsyncIterator[asyncpg.Record], ods_codes: list[str], treatment: str
+) -> AsyncIterator[bytes]:
+    """
+    Yield one serialised WaitTrend per provider in ods_codes order, grouping
+    the (ods_code, period_date, median_weeks) rows as they arrive, so only one
+    provider's trend is held in memory at a time. Providers without rows get
+    their static demo trend, if any, in their request position.
+    """
+    # Serialised directly from the grouped rows, like /api/search, rather
+    # than through WaitTrend models
+    static = {t.ods_code: to_json(t) for t in STATIC_TRENDS if t.treatment == treatment}
+    pending = deque(ods_codes)
+
+    def flush(ods_code: str, periods: list[str], medians: list[float]) -> Iterator[bytes]:
+        while pending[0] != ods_code:
+            skipped = pending.popleft()
+            if skipped in static:
+                yield static[skipped]
+        pending.popleft()
+        yield to_json(
+            {"ods_code": ods_code, "treatment": treatment, "periods": periods, "median_weeks": medians},
+            inf_nan_mode="null",
+        )
+
+    async with aclosing(rows):
+        current: Optional[str] = None
+        periods: list[str] = []
+        medians: list[float] = []
+        async for ods_code, period_date, median in rows:
+            if ods_code != current:
+                if current is not None:
+                    for item in flush(current, periods, medians):
+                        yield item
+                current, periods, medians = ods_code, [], []
+            periods.append(period_date.strftime("%Y-%m"))
+            medians.append(median)
+        if current is not None:
+            for item in flush(current, periods, medians):
+                yield item
+    for ods_code in pending:
+        if ods_code in static:
+            yield static[ods_code]
+
+
+async def _json_array(items: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Wrap a stream of serialised JSON values into a streamed JSON array."""
+    async with aclosing(items):
+        yield b"["
+        sep = b""
+        async for item in items:
+            yield sep + item
+            sep = b","
+        yield b"]"
+
+
+@app.post("/api/trends_bulk", responses={200: {"model": List[WaitTrend]}})
+async def get_trends_bulk(
+    body: BulkTrendsRequest,
+    pool: Optional[asyncpg.Pool] = Depends(get_pg_pool),
+) -> StreamingResponse:
+    """
+    Returns wait time trends for several providers and one treatment using a
+    single query, in request order. Providers with no `wait_metrics` records
+    fall back to the static demo trend data, or are omitted if there is none.
+    Large results are streamed from a server-side cursor as rows arrive; the
+    query is started before the response so database errors still fall back.
+    """
+    ods_codes = list(dict.fromkeys(body.ods_codes))
+    rows = _iter_rows([])
+    if pool is not None and ods_codes:
+        try:
+            rows = await _open_bulk_trend_rows(pool, ods_codes, body.treatment)
+        except Exception:
+            rows = _iter_rows([])
+    return StreamingResponse(
+        _json_array(_bulk_trend_items(rows, ods_codes, body.treatment)),
+        media_type=JSON_MEDIA_TYPE,
+    )